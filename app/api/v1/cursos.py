@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.services.http_client import get_page_content
-from app.services.scraper import parse_html_to_courses
+from curl_cffi.requests.exceptions import RequestException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from app.services.http_client import PermanentError, TransientError, get_page_bytes
+from app.services.scraper import parse_html_to_courses, vacancies_batcher
 from app.models.schemas import (
     SearchResponse, 
-    CursoSchema, 
     VacanteDistribucion, 
     BusquedaMultipleRequest, 
     CursoPorSigla,
@@ -11,16 +12,86 @@ from app.models.schemas import (
 )
 from cachetools import TTLCache
 import asyncio
+import re
 import urllib.parse
+import redis.asyncio as redis_async
+from app.core.coalesce import single_flight
 from app.core.config import get_settings
+from app.core.ratelimit import limiter
+from app.core.logging import get_logger
+
+logger = get_logger("cursos")
 
 router = APIRouter(prefix="/cursos", tags=["Cursos"])
 
-# Caché en memoria RAM (Se reinicia si el servidor se apaga)
+# Caché de respuestas de búsqueda.
+# Si hay REDIS_URL configurado se usa Redis (compartido entre workers/instancias);
+# si no, caché en memoria RAM (se reinicia si el servidor se apaga).
 # TTL configurado en config.py (Default: 1 día / 86400s)
 settings = get_settings()
 cache = TTLCache(maxsize=settings.cache_max_size, ttl=settings.cache_ttl_seconds)
 
+# Límite global de scrapes simultáneos hacia BuscaCursos.
+# Sin esto, N clientes x 20 siglas = cientos de peticiones en vuelo y bloqueos.
+_SCRAPE_SEM = asyncio.Semaphore(settings.scrape_concurrency)
+
+# Plantillas estáticas de error: construidas una sola vez, cada except
+# solo agrega el campo variable (debug).
+_UNAVAILABLE_DETAIL = {"success": False, "error": "UPSTREAM_UNAVAILABLE"}
+
+# Cabeceras para que CDN/edge (Cloudflare/Render) absorban hits repetidos;
+# los datos son estables durante la ventana de caché local.
+# Sin Vary acá: GZipMiddleware ya agrega Vary: Accept-Encoding al comprimir
+# (ponerlo en ambos lados duplicaba el valor en la respuesta).
+_CACHE_HEADERS = {
+    "Cache-Control": "public, max-age=300, stale-while-revalidate=60",
+}
+
+# Validación directa de semestre (mismo formato que BusquedaParams);
+# compilada una sola vez en vez de re-entrar a Pydantic por un solo campo.
+_SEMESTRE_RE = re.compile(r"^20\d{2}-[12S]$")
+
+# Porción fija del query string de BuscaCursos, codificada una sola vez.
+# Solo cxml_semestre y cxml_sigla varían por búsqueda.
+_QS_TAIL = (
+    "&cxml_nrc=&cxml_nombre=&cxml_categoria=TODOS&cxml_area_fg=TODOS"
+    "&cxml_formato_cur=TODOS&cxml_profesor=&cxml_campus=TODOS"
+    "&cxml_unidad_academica=TODOS&cxml_horario_tipo_busqueda=si_tenga"
+    "&cxml_horario_tipo_busqueda_actividad=TODOS&cxml_periodo=TODOS"
+    "&cxml_escuela=TODOS&cxml_nivel=TODOS"
+)
+
+_redis: "redis_async.Redis | None" = None
+if settings.redis_url:
+    _redis = redis_async.from_url(settings.redis_url, decode_responses=True)
+
+
+async def _cache_get(cache_key: str) -> SearchResponse | None:
+    """Get a cached SearchResponse, trying Redis first if configured."""
+    if _redis is not None:
+        try:
+            raw = await _redis.get(f"bc-cache:{cache_key}")
+            if raw:
+                return SearchResponse.model_validate_json(raw)
+        except Exception as e:
+            logger.warning("Redis GET failed (%s), falling back to local cache", e)
+    return cache.get(cache_key)
+
+
+async def _cache_set(cache_key: str, response: SearchResponse) -> None:
+    """Store a SearchResponse in Redis (if configured) and the local cache."""
+    if _redis is not None:
+        try:
+            await _redis.set(
+                f"bc-cache:{cache_key}",
+                response.model_dump_json(),
+                ex=settings.cache_ttl_seconds,
+            )
+        except Exception as e:
+            logger.warning("Redis SET failed (%s), falling back to local cache", e)
+    cache[cache_key] = response
+
+
 async def _buscar_curso_logic(sigla: str, semestre: str) -> SearchResponse:
     """
     Logic for searching a single course with cache.
@@ -28,38 +99,55 @@ async def _buscar_curso_logic(sigla: str, semestre: str) -> SearchResponse:
     # Validar y normalizar sigla
     sigla = sigla.strip().upper()
     cache_key = f"{semestre}_{sigla}"
-    
+
     # 1. Intento de Caché (Gratis)
-    if cache_key in cache:
-        print(f"✅ [CACHE] {sigla} servido desde memoria.")
-        return cache[cache_key]
+    cached_response = await _cache_get(cache_key)
+    if cached_response is not None:
+        logger.debug("cache hit %s %s", sigla, semestre)
+        return cached_response
 
-    # 2. Llamada Externa (Costo Crédito)
-    print(f"🔄 [WEB] Descargando {sigla} desde proveedor...")
-    
-    params = {
-        'cxml_semestre': semestre,
-        'cxml_sigla': sigla,
-        'cxml_nrc': '',
-        'cxml_nombre': '',
-        'cxml_categoria': 'TODOS',
-        'cxml_area_fg': 'TODOS',
-        'cxml_formato_cur': 'TODOS',
-        'cxml_profesor': '',
-        'cxml_campus': 'TODOS',
-        'cxml_unidad_academica': 'TODOS',
-        'cxml_horario_tipo_busqueda': 'si_tenga',
-        'cxml_horario_tipo_busqueda_actividad': 'TODOS',
-        'cxml_periodo': 'TODOS',
-        'cxml_escuela': 'TODOS',
-        'cxml_nivel': 'TODOS'
-    }
-
-    url_target = "https://buscacursos.uc.cl/"
-    html = await get_page_content(url_target, params)
-    
-    # Si falla el scraping, devolvemos vacío y NO cacheamos el error
-    if not html or "resultadosRow" not in html:
+    # 2. Single-flight: peticiones concurrentes idénticas durante un cache
+    # miss esperan el mismo scrape en vez de disparar N duplicados
+    return await single_flight(
+        ("buscar", cache_key),
+        lambda: _scrape_curso(sigla, semestre, cache_key),
+    )
+
+
+async def _scrape_curso(sigla: str, semestre: str, cache_key: str) -> SearchResponse:
+    """Download and parse a single sigla, populating the cache on success."""
+    # Llamada Externa (Costo Crédito)
+    logger.info("scrape %s %s", sigla, semestre)
+
+    # Solo los dos campos variables se codifican por llamada; el resto va
+    # pre-codificado en _QS_TAIL.
+    url_target = (
+        "https://buscacursos.uc.cl/"
+        f"?cxml_semestre={urllib.parse.quote(semestre, safe='')}"
+        f"&cxml_sigla={urllib.parse.quote(sigla, safe='')}"
+        f"{_QS_TAIL}"
+    )
+    try:
+        # Bytes crudos: el parser (lxml) decodifica dentro de libxml2, sin
+        # materializar el str intermedio de response.text
+        html = await get_page_bytes(url_target, {})
+    except (TimeoutError, ConnectionError, RequestException, TransientError, PermanentError) as e:
+        # isinstance sobre tipos concretos, no sniffing de substrings en str(e)
+        raise HTTPException(
+            status_code=503,
+            detail={**_UNAVAILABLE_DETAIL, "debug": f"{type(e).__name__}: {e}"},
+        )
+
+    # Scraping caído: 503 explícito en vez de fingir "0 resultados".
+    # No se cachea el error.
+    if not html:
+        raise HTTPException(
+            status_code=503,
+            detail={**_UNAVAILABLE_DETAIL, "debug": f"empty response for {sigla} {semestre}"},
+        )
+
+    # Página válida sin filas = la sigla no tiene secciones ese semestre
+    if b"resultadosRow" not in html:
         return SearchResponse(semestre=semestre, cantidad=0, resultados=[])
 
     cursos = parse_html_to_courses(html)
@@ -71,16 +159,58 @@ async def _buscar_curso_logic(sigla: str, semestre: str) -> SearchResponse:
     )
 
     # Guardamos en caché
-    cache[cache_key] = response
+    await _cache_set(cache_key, response)
     return response
 
 
+async def warm_cache(siglas: list[str], semestre: str) -> None:
+    """
+    Prefetch popular siglas into the cache (called from the lifespan hook).
+    Failures are logged and skipped: warmup must never block startup.
+    """
+    async def _warm(sigla: str) -> None:
+        try:
+            async with _SCRAPE_SEM:
+                await _buscar_curso_logic(sigla, semestre)
+        except Exception as e:
+            logger.warning("cache warmup failed for %s: %s", sigla, e)
+
+    await asyncio.gather(*(_warm(s) for s in siglas))
+    logger.info("cache warmup done: %d siglas (%s)", len(siglas), semestre)
+
+
 @router.get("/buscar", response_model=SearchResponse)
+@limiter.limit("30/minute")
 async def buscar_cursos(
+    request: Request,
     sigla: str = Query(..., description="Sigla del curso"),
     semestre: str = Query(..., description="Semestre")
 ):
-    return await _buscar_curso_logic(sigla, semestre)
+    # Devolver una Response ya serializada evita que FastAPI re-valide el
+    # response_model (el objeto ya viene tipado desde _buscar_curso_logic)
+    result = await _buscar_curso_logic(sigla, semestre)
+    return ORJSONResponse(content=result.model_dump(), headers=_CACHE_HEADERS)
+
+
+@router.get("/info/{sigla}", response_model=SearchResponse)
+@limiter.limit("30/minute")
+async def get_curso_info(
+    request: Request,
+    sigla: str,
+    semestre: str = Query(..., description="Semestre")
+):
+    """
+    Alias de /buscar con la sigla en el path.
+    Delega directo en _buscar_curso_logic para no re-entrar por el stack
+    de validación del otro endpoint.
+    """
+    if not _SEMESTRE_RE.match(semestre.strip()):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato de semestre inválido: '{semestre}'. Debe ser YYYY-S (ej: 2026-1)",
+        )
+    result = await _buscar_curso_logic(sigla, semestre.strip())
+    return ORJSONResponse(content=result.model_dump(), headers=_CACHE_HEADERS)
 
 
 @router.post("/buscar-multiple", response_model=APIResponse[list[CursoPorSigla]])
@@ -92,13 +222,24 @@ async def buscar_cursos_multiple_endpoint(
     """
     async def buscar_wrapper(sigla: str) -> CursoPorSigla:
         try:
-            result = await _buscar_curso_logic(sigla, request.semestre)
+            # Deadline por sigla: una sección lenta no estira todo el batch
+            async with asyncio.timeout(settings.scrape_timeout_seconds):
+                # El semáforo acota cuántas siglas se scrapean en paralelo
+                async with _SCRAPE_SEM:
+                    result = await _buscar_curso_logic(sigla, request.semestre)
             return CursoPorSigla(
                 sigla=sigla,
                 success=True,
                 cursos=result.resultados, # Use .resultados from SearchResponse
                 error=None
             )
+        except TimeoutError:
+            return CursoPorSigla(
+                sigla=sigla,
+                success=False,
+                cursos=[],
+                error="timeout"
+            )
         except Exception as e:
             return CursoPorSigla(
                 sigla=sigla,
@@ -107,13 +248,16 @@ async def buscar_cursos_multiple_endpoint(
                 error=str(e)
             )
 
-    # Execute consistent with limit if needed, but for now gather all
-    resultados = await asyncio.gather(*[buscar_wrapper(s) for s in request.siglas])
+    # TaskGroup cancela limpio si algo explota; buscar_wrapper nunca
+    # propaga, así que cada sigla entrega su resultado parcial
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(buscar_wrapper(s)) for s in request.siglas]
+    resultados = [t.result() for t in tasks]
     
     exitosos = sum(1 for r in resultados if r.success)
     total_cursos = sum(len(r.cursos) for r in resultados)
     
-    return APIResponse(
+    response = APIResponse(
         success=True,
         data=list(resultados),
         message=f"Búsqueda completada: {exitosos}/{len(request.siglas)} siglas exitosas",
@@ -122,15 +266,23 @@ async def buscar_cursos_multiple_endpoint(
             "total_secciones": total_cursos
         }
     )
+    # Serializar una sola vez: con 20 siglas x decenas de cursos, la segunda
+    # pasada de validación del response_model re-caminaba todo el árbol
+    return ORJSONResponse(content=response.model_dump())
 
 
 @router.get("/vacantes", response_model=list[VacanteDistribucion])
+@limiter.limit("60/minute")
 async def get_vacantes_endpoint(
+    request: Request,
+    response: Response,
     nrc: str = Query(..., description="NRC del curso"),
     semestre: str = Query(..., description="Semestre (ej: 2025-1)")
 ):
     """
     Get detailed vacancy distribution.
+    Las ráfagas de NRCs (una tabla completa de la UI) se agrupan en un
+    solo batch concurrente vía el batcher.
     """
-    from app.services.scraper import get_vacantes_detalle
-    return await get_vacantes_detalle(nrc=nrc, semestre=semestre)
+    response.headers.update(_CACHE_HEADERS)
+    return await vacancies_batcher.get(nrc, semestre)
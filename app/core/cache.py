@@ -2,13 +2,12 @@
 In-memory TTL cache implementation for scraping results.
 Prevents excessive requests to BuscaCursos UC.
 """
-import asyncio
-import hashlib
 from functools import wraps
 from typing import Any, Callable, TypeVar, ParamSpec
 
 from cachetools import TTLCache
 
+from .coalesce import single_flight
 from .config import get_settings
 from .logging import get_logger
 
@@ -17,17 +16,36 @@ logger = get_logger("cache")
 P = ParamSpec("P")
 T = TypeVar("T")
 
-# Global cache instance
-_cache: TTLCache | None = None
-_lock = asyncio.Lock()
+class CountingTTLCache(TTLCache):
+    """
+    TTLCache that tracks hit/miss counters for get_cache_stats.
+    Counting happens in __getitem__ so every lookup path is covered.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            value = super().__getitem__(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        return value
 
 
-def get_cache() -> TTLCache:
+# Global cache instance
+_cache: CountingTTLCache | None = None
+
+def get_cache() -> CountingTTLCache:
     """Get or create the global cache instance."""
     global _cache
     if _cache is None:
         settings = get_settings()
-        _cache = TTLCache(
+        _cache = CountingTTLCache(
             maxsize=settings.cache_max_size,
             ttl=settings.cache_ttl_seconds
         )
@@ -38,44 +56,86 @@ def get_cache() -> TTLCache:
     return _cache
 
 
-def make_cache_key(*args: Any, **kwargs: Any) -> str:
-    """Generate a consistent cache key from function arguments."""
-    key_parts = [str(arg) for arg in args]
-    key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
-    key_string = ":".join(key_parts)
-    return hashlib.md5(key_string.encode()).hexdigest()
+def make_cache_key(*args: Any, **kwargs: Any) -> tuple:
+    """
+    Generate a consistent cache key from function arguments.
+    A plain tuple: hashing it is the dict's job, no digest needed.
+    """
+    return (args, tuple(sorted(kwargs.items())))
 
 
-def cached(func: Callable[P, T]) -> Callable[P, T]:
+def cached(
+    func: Callable[P, T] | None = None,
+    *,
+    ttl: float | None = None,
+    maxsize: int | None = None,
+    key: Callable[..., Any] | None = None,
+) -> Callable:
     """
     Async decorator that caches function results.
-    
-    Usage:
+
+    Bare usage shares the global cache (settings-driven TTL):
         @cached
         async def fetch_data(url: str) -> dict:
             ...
+
+    With ``ttl``/``maxsize`` the function gets its own cache with its own
+    policy (e.g. short-lived entries); ``key`` overrides how arguments are
+    turned into the cache key:
+        @cached(ttl=60, key=lambda sigla, semestre: (sigla, semestre))
+        async def search(sigla: str, semestre: str) -> list:
+            ...
     """
-    @wraps(func)
-    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-        cache = get_cache()
-        cache_key = f"{func.__name__}:{make_cache_key(*args, **kwargs)}"
-        
-        # Check cache first
-        async with _lock:
-            if cache_key in cache:
-                logger.debug(f"Cache HIT: {cache_key[:20]}...")
-                return cache[cache_key]
-        
-        # Execute function and cache result
-        logger.debug(f"Cache MISS: {cache_key[:20]}...")
-        result = await func(*args, **kwargs)
-        
-        async with _lock:
-            cache[cache_key] = result
-        
-        return result
-    
-    return wrapper
+    def decorator(fn: Callable[P, T]) -> Callable[P, T]:
+        # Caché propio solo si se pidió una política distinta a la global;
+        # se crea perezosamente para no leer settings en tiempo de import
+        local_cache: CountingTTLCache | None = None
+        use_local = ttl is not None or maxsize is not None
+
+        @wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            nonlocal local_cache
+            if use_local:
+                if local_cache is None:
+                    settings = get_settings()
+                    local_cache = CountingTTLCache(
+                        maxsize=maxsize if maxsize is not None else settings.cache_max_size,
+                        ttl=ttl if ttl is not None else settings.cache_ttl_seconds,
+                    )
+                cache = local_cache
+            else:
+                cache = get_cache()
+            key_args = key(*args, **kwargs) if key else make_cache_key(*args, **kwargs)
+            cache_key = (fn.__name__, key_args)
+
+            # Lectura sin lock: TTLCache no cede el control (no hay await dentro),
+            # así que bajo un solo event loop el acceso es atómico entre corutinas.
+            # Un solo lookup (try/except) en vez de `in` + `[]`, y así los
+            # contadores hit/miss del CountingTTLCache quedan exactos.
+            try:
+                result = cache[cache_key]
+            except KeyError:
+                pass
+            else:
+                logger.debug(f"Cache HIT: {repr(cache_key)[:40]}...")
+                return result
+
+            logger.debug(f"Cache MISS: {repr(cache_key)[:40]}...")
+
+            async def _compute() -> T:
+                value = await fn(*args, **kwargs)
+                cache[cache_key] = value
+                return value
+
+            # Single-flight: si la misma key ya se está calculando, esperar ese
+            # resultado en vez de ejecutar la función de nuevo
+            return await single_flight(cache_key, _compute)
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 
 def clear_cache() -> int:
@@ -95,6 +155,6 @@ def get_cache_stats() -> dict:
         "current_size": len(cache),
         "max_size": settings.cache_max_size,
         "ttl_seconds": settings.cache_ttl_seconds,
-        "hits": getattr(cache, "hits", "N/A"),
-        "misses": getattr(cache, "misses", "N/A"),
+        "hits": cache.hits,
+        "misses": cache.misses,
     }
@@ -0,0 +1,54 @@
+"""
+Request coalescing (single-flight) for async operations.
+
+When several coroutines need the same expensive result at the same time
+(e.g. two users searching the same sigla during a cache miss), only the
+first one runs the operation; the rest await the same Future.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+# Un Future por key en vuelo; se elimina apenas la operación termina,
+# así que el dict se mantiene pequeño (solo operaciones activas).
+_in_flight: dict[Hashable, asyncio.Future] = {}
+
+
+async def single_flight(key: Hashable, coro_factory: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run ``coro_factory()`` unless an identical call (same ``key``) is
+    already in flight, in which case await that call's result instead.
+
+    Exceptions propagate to every waiter; nothing is cached here — the
+    coalescing window is exactly the lifetime of the in-flight call.
+    """
+    existing = _in_flight.get(key)
+    if existing is not None:
+        # shield: cancelar a UN waiter no debe cancelar el Future compartido
+        # (dejaría set_result del líder en InvalidStateError y rompería al
+        # resto); el CancelledError propio igual corta este await
+        return await asyncio.shield(existing)
+
+    fut: asyncio.Future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = fut
+    try:
+        result = await coro_factory()
+        if not fut.done():
+            fut.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        # Si cancelan al líder (timeout por sigla, cliente desconectado) los
+        # waiters no pueden quedar colgados de un Future que nunca resuelve:
+        # se cancela el Future y cada waiter recibe el CancelledError
+        if not fut.done():
+            fut.cancel()
+        raise
+    except BaseException as e:
+        if not fut.done():
+            fut.set_exception(e)
+            # Marcar la excepción como consumida por si nadie más espera el Future
+            fut.exception()
+        raise
+    finally:
+        del _in_flight[key]
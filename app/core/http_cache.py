@@ -0,0 +1,132 @@
+"""
+ASGI-level response cache for the cursos GET endpoints.
+
+Repeat GETs are served directly from memory before routing, dependency
+resolution, Pydantic validation or response serialization run — a hot
+request becomes a dict lookup plus a socket write. Responses carry a
+strong ETag and clients sending a matching If-None-Match get an empty
+304 instead of the full body.
+"""
+import hashlib
+import urllib.parse
+from typing import Any
+
+from cachetools import TTLCache
+
+from .config import get_settings
+from .logging import get_logger
+
+logger = get_logger("http_cache")
+
+# Only cache the read-only course endpoints; /health and POST routes pass through.
+_CACHEABLE_PREFIXES = ("/api/v1/cursos",)
+
+# Shared instance so /cache/clear can purge cached responses too.
+_response_cache: TTLCache | None = None
+
+
+class ResponseCacheMiddleware:
+    """Pure-ASGI middleware that caches successful GET responses."""
+
+    def __init__(self, app: Any, max_age: int = 300):
+        global _response_cache
+        self.app = app
+        settings = get_settings()
+        self._cache: TTLCache = TTLCache(maxsize=settings.cache_max_size, ttl=max_age)
+        _response_cache = self._cache
+
+    @staticmethod
+    def _make_key(scope: dict) -> str | None:
+        """Build a canonical cache key, or None if the request is not cacheable."""
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return None
+        path = scope["path"]
+        if not path.startswith(_CACHEABLE_PREFIXES):
+            return None
+        # Normalize query params so /buscar?sigla=ics2123 and ?sigla=ICS2123 collide
+        query = scope.get("query_string", b"").decode("latin-1")
+        params = sorted(
+            (k, v.strip().upper() if k == "sigla" else v)
+            for k, v in urllib.parse.parse_qsl(query)
+        )
+        return f"{path}?{urllib.parse.urlencode(params)}"
+
+    @staticmethod
+    def _client_etag(scope: dict) -> str | None:
+        """Extract the If-None-Match header from the request, if any."""
+        for name, value in scope.get("headers", []):
+            if name == b"if-none-match":
+                return value.decode("latin-1").strip('"')
+        return None
+
+    async def _send_response(
+        self, send: Any, scope: dict, status: int, headers: tuple, body: bytes, etag: str
+    ) -> None:
+        """Send a response, downgrading to an empty 304 if the client ETag matches."""
+        if self._client_etag(scope) == etag:
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", f'"{etag}"'.encode())],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+        # Lista fresca por envío: los middlewares de afuera (GZip) mutan la
+        # lista del mensaje in place; nunca se les entrega el snapshot cacheado
+        await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        key = self._make_key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        entry = self._cache.get(key)
+        if entry is not None:
+            status, headers, body, etag = entry
+            logger.debug("HTTP cache HIT: %s", key)
+            await self._send_response(send, scope, status, headers, body, etag)
+            return
+
+        # Buffer the downstream response so the ETag can be attached before sending
+        captured: dict[str, Any] = {"status": 0, "headers": [], "body": bytearray()}
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                captured["body"].extend(message.get("body", b""))
+
+        await self.app(scope, receive, send_wrapper)
+
+        status = captured["status"]
+        headers = captured["headers"]
+        body = bytes(captured["body"])
+
+        if status != 200:
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        # Strong ETag over the serialized body; stored so repeat hits don't rehash
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        headers.append((b"etag", f'"{etag}"'.encode()))
+        # Snapshot inmutable: si se cacheara la misma lista que viaja en el
+        # mensaje, GZipMiddleware le agregaría content-encoding/content-length
+        # del body comprimido y cada hit posterior replicaría esas cabeceras
+        # sobre el body sin comprimir
+        headers = tuple(headers)
+        self._cache[key] = (status, headers, body, etag)
+        await self._send_response(send, scope, status, headers, body, etag)
+
+
+def clear_response_cache() -> int:
+    """Clear all cached responses. Returns the number of entries cleared."""
+    if _response_cache is None:
+        return 0
+    count = len(_response_cache)
+    _response_cache.clear()
+    logger.info("HTTP response cache cleared: %d entries removed", count)
+    return count
@@ -1,10 +1,15 @@
 """
 Logging configuration with structured JSON output for production.
 """
+import atexit
 import logging
+import queue
 import sys
+
+import orjson
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
-from typing import Any
 
 from .config import get_settings
 
@@ -14,7 +19,9 @@ class JSONFormatter(logging.Formatter):
     
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            # record.created ya es epoch float (lo puso logging al crear el
+            # record); orjson lo serializa directo, sin construir datetimes
+            "timestamp": record.created,
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -30,9 +37,23 @@ class JSONFormatter(logging.Formatter):
         # Add extra fields
         if hasattr(record, "extra_data"):
             log_data.update(record.extra_data)
-        
-        import json
-        return json.dumps(log_data, ensure_ascii=False)
+
+        return orjson.dumps(log_data).decode()
+
+
+class _PassthroughQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records untouched.
+
+    The stock prepare() pre-formats the record and nulls exc_info, which
+    both does the formatting work on the event-loop thread and hides the
+    traceback from the listener-side JSONFormatter. The queue is an
+    in-process SimpleQueue (nothing gets pickled), so passing the record
+    through as-is is safe and keeps formatting on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
 
 class DevelopmentFormatter(logging.Formatter):
@@ -76,11 +97,16 @@ def setup_logging() -> logging.Logger:
     else:
         handler.setFormatter(DevelopmentFormatter())
     
-    logger.addHandler(handler)
-    
+    # Emit through a queue so formatting/writing happens off the event loop
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(_PassthroughQueueHandler(log_queue))
+
     # Prevent propagation to root logger
     logger.propagate = False
-    
+
     return logger
 
 
@@ -88,8 +114,13 @@ def setup_logging() -> logging.Logger:
 logger = setup_logging()
 
 
+@lru_cache(maxsize=None)
 def get_logger(name: str | None = None) -> logging.Logger:
-    """Get a logger instance, optionally with a specific name."""
+    """
+    Get a logger instance, optionally with a specific name.
+    Memoized: logging.getLogger walks the manager dict under a global lock,
+    so repeated lookups for the same name resolve from the lru_cache instead.
+    """
     if name:
         return logging.getLogger(f"buscacursos_api.{name}")
     return logger
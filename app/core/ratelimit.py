@@ -0,0 +1,13 @@
+"""
+Per-IP rate limiting via slowapi.
+
+Caps how often a single client can force upstream scrapes: the cache and
+the response-cache middleware absorb repeats, but nothing stopped a
+pathological client from cycling unique siglas or hammering the
+diagnostic endpoints that always hit BuscaCursos.
+"""
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+# Instancia compartida; los endpoints la importan para decorar sus límites
+limiter = Limiter(key_func=get_remote_address)
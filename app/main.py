@@ -5,17 +5,31 @@ A production-ready RESTful API for scraping course data from BuscaCursos UC.
 """
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, status
+import orjson
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 
 from app.api.v1 import cursos, health
 from app.core.config import get_settings
+from app.core.http_cache import ResponseCacheMiddleware
 from app.core.logging import get_logger
+from app.core.ratelimit import limiter
+from app.services.http_client import close_http_client, get_http_client
 
 
 logger = get_logger("main")
 
+# Cuerpo del endpoint raíz: completamente estático, serializado una vez
+_ROOT_BODY = orjson.dumps({
+    "message": "BuscaCursos UC API",
+    "docs": "/docs",
+    "health": "/api/v1/health",
+})
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -28,12 +42,26 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Cache TTL: {settings.cache_ttl_seconds}s")
-    
+
+    # Instanciar el cliente compartido ya en startup: la primera petición
+    # real no paga la creación de sesión
+    get_http_client()
+
+    # Warmup: precargar siglas populares para que la primera petición real
+    # sea cache hit. Solo en producción (en dev cada arranque scrapearía).
+    if (
+        settings.environment == "production"
+        and settings.warm_siglas
+        and settings.warm_cache_semestre
+    ):
+        logger.info(f"Warming cache for {len(settings.warm_siglas)} siglas...")
+        await cursos.warm_cache(settings.warm_siglas, settings.warm_cache_semestre)
+
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
-    # await close_http_client() # No longer needed
+    await close_http_client()
     logger.info("Application shutdown complete")
 
 
@@ -77,8 +105,20 @@ Proyecto open-source para la comunidad UC.
         redoc_url="/redoc",
         openapi_url="/openapi.json",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
     
+    # Rate limiting por IP (los límites se declaran en cada endpoint)
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    # Serve repeat GETs from memory before handler code runs
+    app.add_middleware(ResponseCacheMiddleware, max_age=300)
+
+    # Compress multi-KB course listings; runs outside the response cache so
+    # cached bodies stay uncompressed and get re-encoded per Accept-Encoding
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+
     # Configure CORS
     app.add_middleware(
         CORSMiddleware,
@@ -96,7 +136,7 @@ Proyecto open-source para la comunidad UC.
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
         logger.error(f"Unhandled exception: {exc}", exc_info=True)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={
                 "success": False,
@@ -109,11 +149,7 @@ Proyecto open-source para la comunidad UC.
     @app.get("/", include_in_schema=False)
     async def root():
         """Redirect to API documentation."""
-        return {
-            "message": "BuscaCursos UC API",
-            "docs": "/docs",
-            "health": "/api/v1/health",
-        }
+        return Response(content=_ROOT_BODY, media_type="application/json")
     
     return app
 
@@ -123,12 +159,19 @@ app = create_app()
 
 
 if __name__ == "__main__":
+    import os
+
     import uvicorn
-    
+
     settings = get_settings()
+    # uvloop + httptools vienen con uvicorn[standard]; WEB_CONCURRENCY
+    # permite escalar a varios workers en el host (Render lo setea solo)
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
         reload=settings.environment == "development",
     )
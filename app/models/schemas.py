@@ -1,10 +1,14 @@
 """
 Pydantic schemas for API request/response validation.
 """
-import re
-from typing import Any, Generic, TypeVar
+from typing import Annotated, Any, Generic, TypeVar
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+# Los patrones viven en Field(pattern=...): pydantic-core los compila una vez
+# y los evalúa en Rust, sin re-entrar a Python por cada request.
+SIGLA_PATTERN = r"^[A-Z]{3}\d{3,4}[A-Z]?$"
+SEMESTRE_PATTERN = r"^20\d{2}-[12S]$"
 
 
 # ============================================================================
@@ -13,7 +17,21 @@ from pydantic import BaseModel, Field, field_validator
 
 class HorarioSchema(BaseModel):
     """Schema for a single schedule block."""
-    
+
+    # frozen + tuplas: los bloques de horario son inmutables una vez
+    # parseados, y pydantic-core serializa tuplas con menos allocations
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
+            "example": {
+                "tipo": "CLAS",
+                "dia": "Lunes",
+                "modulos": [1, 2],
+                "sala": "A-101"
+            }
+        },
+    )
+
     tipo: str = Field(
         ...,
         description="Tipo de actividad: CLAS, AYU, LAB, TAL, TER, PRA, etc.",
@@ -24,8 +42,8 @@ class HorarioSchema(BaseModel):
         description="Día de la semana en español",
         examples=["Lunes", "Martes", "Miércoles"]
     )
-    modulos: list[int] = Field(
-        default_factory=list,
+    modulos: tuple[int, ...] = Field(
+        default_factory=tuple,
         description="Lista de módulos (1-8)",
         examples=[[1, 2], [3, 4, 5]]
     )
@@ -34,17 +52,6 @@ class HorarioSchema(BaseModel):
         description="Sala asignada",
         examples=["A-101", "B-302"]
     )
-    
-    
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "tipo": "CLAS",
-                "dia": "Lunes",
-                "modulos": [1, 2],
-                "sala": "A-101"
-            }
-        }
 
 
 # ============================================================================
@@ -157,12 +164,14 @@ class BusquedaParams(BaseModel):
     sigla: str = Field(
         ...,
         description="Sigla del curso (ej: ICS2123, MAT1610)",
+        pattern=SIGLA_PATTERN,
         min_length=3,
         max_length=10
     )
     semestre: str = Field(
         ...,
         description="Semestre en formato YYYY-S donde S es 1, 2 o S",
+        pattern=SEMESTRE_PATTERN,
         examples=["2025-1", "2025-2", "2025-S"]
     )
     profesor: str | None = Field(
@@ -174,37 +183,24 @@ class BusquedaParams(BaseModel):
         default=None,
         description="Filtrar por campus"
     )
-    
-    @field_validator("sigla")
+
+    @field_validator("sigla", mode="before")
     @classmethod
-    def validate_sigla(cls, v: str) -> str:
-        """Validate and normalize course code format."""
-        v = v.strip().upper()
-        # Pattern: 3 letters, 3-4 digits, optional letter
-        if not re.match(r"^[A-Z]{3}\d{3,4}[A-Z]?$", v):
-            raise ValueError(
-                f"Formato de sigla inválido: '{v}'. "
-                "Debe ser 3 letras + 3-4 dígitos + letra opcional (ej: ICS2123, MAT1610)"
-            )
-        return v
-    
-    @field_validator("semestre")
+    def normalize_sigla(cls, v: str) -> str:
+        """Normalize course code before the Field pattern runs."""
+        return v.strip().upper() if isinstance(v, str) else v
+
+    @field_validator("semestre", mode="before")
     @classmethod
-    def validate_semestre(cls, v: str) -> str:
-        """Validate semester format."""
-        v = v.strip()
-        if not re.match(r"^20\d{2}-[12S]$", v):
-            raise ValueError(
-                f"Formato de semestre inválido: '{v}'. "
-                "Debe ser YYYY-S donde S es 1, 2 o S (ej: 2025-1, 2025-S)"
-            )
-        return v
+    def normalize_semestre(cls, v: str) -> str:
+        """Strip whitespace before the Field pattern runs."""
+        return v.strip() if isinstance(v, str) else v
 
 
 class BusquedaMultipleRequest(BaseModel):
     """Request body for bulk course search."""
     
-    siglas: list[str] = Field(
+    siglas: list[Annotated[str, Field(pattern=SIGLA_PATTERN)]] = Field(
         ...,
         description="Lista de siglas a buscar (máximo 20)",
         min_length=1,
@@ -214,36 +210,24 @@ class BusquedaMultipleRequest(BaseModel):
     semestre: str = Field(
         ...,
         description="Semestre en formato YYYY-S",
+        pattern=SEMESTRE_PATTERN,
         examples=["2026-1", "2025-2"]
     )
-    
-    @field_validator("siglas")
-    @classmethod
-    def validate_siglas(cls, v: list[str]) -> list[str]:
-        """Validate and normalize all siglas."""
-        normalized = []
-        for sigla in v:
-            sigla = sigla.strip().upper()
-            if not re.match(r"^[A-Z]{3}\d{3,4}[A-Z]?$", sigla):
-                raise ValueError(
-                    f"Formato de sigla inválido: '{sigla}'. "
-                    "Debe ser 3 letras + 3-4 dígitos + letra opcional"
-                )
-            normalized.append(sigla)
-        return normalized
-    
-    @field_validator("semestre")
+
+    @field_validator("siglas", mode="before")
     @classmethod
-    def validate_semestre(cls, v: str) -> str:
-        """Validate semester format."""
-        v = v.strip()
-        if not re.match(r"^20\d{2}-[12S]$", v):
-            raise ValueError(
-                f"Formato de semestre inválido: '{v}'. "
-                "Debe ser YYYY-S donde S es 1, 2 o S"
-            )
+    def normalize_siglas(cls, v: list[str]) -> list[str]:
+        """Normalize all siglas before the per-item pattern runs."""
+        if isinstance(v, list):
+            return [s.strip().upper() if isinstance(s, str) else s for s in v]
         return v
 
+    @field_validator("semestre", mode="before")
+    @classmethod
+    def normalize_semestre(cls, v: str) -> str:
+        """Strip whitespace before the Field pattern runs."""
+        return v.strip() if isinstance(v, str) else v
+
 
 class CursoPorSigla(BaseModel):
     """Result wrapper for each sigla in bulk search."""
@@ -1,80 +1,309 @@
 import os
+import re
 import urllib.parse
+from functools import lru_cache
+
 import httpx
+from cachetools import TTLCache
 from curl_cffi.requests import AsyncSession
+from curl_cffi.requests.exceptions import RequestException
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+    wait_random,
+)
 
-# Global client for reusing connections if needed (optional optimization)
-# For now, following the requested pattern of creating clients per request or as needed.
+from app.core.coalesce import single_flight
+from app.core.logging import get_logger
 
-async def get_page_content(url_base: str, params: dict) -> str:
-    env = os.getenv("ENVIRONMENT", "development")
-    
-    # --- PRODUCCIÓN: SCRAPINGANT ---
-    if env == "production":
-        api_key = os.getenv("SCRAPINGANT_API_KEY")
-        if not api_key:
-            print("❌ Error: Falta SCRAPINGANT_API_KEY")
-            return ""
 
+logger = get_logger("http_client")
+
+
+class TransientError(Exception):
+    """Recoverable upstream failure (timeout, connection, 5xx, 429)."""
+
+
+class PermanentError(Exception):
+    """Non-recoverable failure; retrying would only hammer the origin."""
+
+# Porción fija del query de búsqueda, codificada una sola vez; solo
+# cxml_semestre y cxml_sigla varían por llamada
+_SEARCH_QS_TAIL = (
+    "&cxml_horario_tipo_busqueda=si_tenga"
+    "&cxml_horario_tipo_busqueda_actividad=TODOS"
+)
+
+
+# Perfiles de navegador para rotar la huella TLS cuando BuscaCursos
+# responde 403; todos soportados por curl_cffi como impersonate=
+BROWSER_VERSIONS = (
+    "chrome120",
+    "chrome119",
+    "chrome123",
+    "chrome124",
+    "edge101",
+    "safari170",
+)
+
+# Centinelas compilados: una sola pasada case-insensitive sobre los bytes
+# crudos en vez de varios `in` + .lower() sobre el buffer completo
+_DATA_RE = re.compile(rb"resultadosRow")
+_BLOCK_RE = re.compile(rb"captcha|cf-turnstile|just a moment", re.IGNORECASE)
+
+# Cabeceras de navegador para el fetch directo: literales puros, armadas
+# una sola vez en vez de reconstruir el dict en cada request
+_BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://buscacursos.uc.cl/",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+
+@lru_cache(maxsize=512)
+def _build_search_url(semestre: str, sigla: str) -> str:
+    """Build (and memoize) the full BuscaCursos search URL for a pair."""
+    return (
+        "https://buscacursos.uc.cl/"
+        f"?cxml_semestre={urllib.parse.quote(semestre, safe='')}"
+        f"&cxml_sigla={urllib.parse.quote(sigla, safe='')}"
+        f"{_SEARCH_QS_TAIL}"
+    )
+
+
+class ScrapingHTTPClient:
+    """
+    Shared HTTP client for scraping BuscaCursos.
+
+    Holds one persistent curl_cffi AsyncSession (Chrome impersonation) for
+    direct fetches and one httpx client for the ScrapingAnt proxy used in
+    production. Both are created lazily and live for the whole process —
+    keep-alive connections and the TLS handshake get paid once, not per
+    request. Closed from the FastAPI lifespan via close_http_client().
+    """
+
+    def __init__(self) -> None:
+        self._session: AsyncSession | None = None
+        self._httpx: httpx.AsyncClient | None = None
+        # Micro-caché de HTML de búsquedas recientes: absorbe ráfagas por la
+        # misma sigla sin interferir con la caché de resultados de la API
+        self._search_cache: TTLCache = TTLCache(maxsize=256, ttl=30)
+        # Resueltos una sola vez: el entorno no cambia durante la vida del
+        # proceso, así que no hay os.getenv ni comparación de strings por request
+        self._use_proxy = os.getenv("ENVIRONMENT", "development") == "production"
+        self._api_key = os.getenv("SCRAPINGANT_API_KEY")
+        # Huella TLS activa; rota ante un 403 sin cerrar la sesión (cerrar
+        # tiraría también las conexiones keep-alive de requests en vuelo).
+        # Índice determinista: recorre los perfiles en orden, sin PRNG.
+        self._browser_idx = 0
+        self._browser = BROWSER_VERSIONS[0]
+        # Reciclaje periódico de la sesión curl: AsyncSession acumula memoria
+        # nativa en corridas largas, así que cada N requests se cierra y la
+        # siguiente petición crea una fresca (acota el RSS del worker)
+        self._req_count = 0
+        self._recycle_every = 10000
+
+    def _get_session(self) -> AsyncSession:
+        """Get (or lazily create) the persistent curl_cffi session."""
+        if self._session is None:
+            self._session = AsyncSession(impersonate="chrome120")
+        return self._session
+
+    def _get_httpx(self) -> httpx.AsyncClient:
+        """Get (or lazily create) the shared httpx client (ScrapingAnt)."""
+        if self._httpx is None:
+            # http2=True multiplexa las peticiones concurrentes a ScrapingAnt
+            # sobre una conexión TLS en vez de abrir un socket por cada una
+            self._httpx = httpx.AsyncClient(
+                timeout=60.0,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30,
+                ),
+            )
+        return self._httpx
+
+    async def fetch(self, url: str, params: dict | None = None):
+        """
+        Low-level GET through the persistent curl session.
+        Returns the raw response (status_code/text/content); transport
+        errors propagate typed (curl_cffi RequestException subclasses).
+        """
+        self._req_count += 1
+        if self._req_count >= self._recycle_every:
+            self._req_count = 0
+            # Desenganchar antes de cerrar; un request en vuelo sobre la
+            # sesión vieja puede fallar, pero sale como TransientError y el
+            # retry lo repite sobre la sesión nueva
+            old, self._session = self._session, None
+            if old is not None:
+                await old.close()
+        # impersonate= por petición: permite rotar la huella sin recrear la
+        # sesión (y sin perder las conexiones keep-alive ya establecidas)
+        return await self._get_session().get(
+            url,
+            params=params or None,
+            headers=_BROWSER_HEADERS,
+            timeout=30,
+            impersonate=self._browser,
+        )
+
+    def _rotate_browser(self) -> None:
+        """Switch to the next TLS fingerprint after a 403."""
+        self._browser_idx = (self._browser_idx + 1) % len(BROWSER_VERSIONS)
+        self._browser = BROWSER_VERSIONS[self._browser_idx]
+        logger.warning("🔄 Rotando huella de navegador a %s", self._browser)
+
+    # Solo errores transitorios reintentan (nunca 4xx ni bugs); el backoff
+    # exponencial lleva jitter para no sincronizar reintentos entre clientes
+    @retry(
+        retry=retry_if_exception_type(TransientError),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=15) + wait_random(0, 1),
+        reraise=True,
+    )
+    async def _fetch_direct(self, url: str, params: dict | None):
+        """fetch() with a typed retry budget for transient failures."""
         try:
-            query_string = urllib.parse.urlencode(params)
-            target_url = f"{url_base}?{query_string}"
-            
-            # Configuración "Low Cost" con parámetros del ejemplo
-            # Validado: http.client funciona donde httpx/async puede fallar en este entorno
-            import http.client
-            import asyncio
-            
-            # Construct parameters exactly as in the user example
-            sa_params = {
-                'url': target_url,
-                'x-api-key': api_key,
-                'proxy_type': 'residential',
-                'browser': 'true',  # Required to avoid 423
-                'return_page_source': 'true',
-            }
-            
-            def _sync_request():
-                try:
-                    conn = http.client.HTTPSConnection("api.scrapingant.com", timeout=60)
-                    # Helper to build query string for ScrapingAnt
-                    # We need to manually encode params
-                    q = urllib.parse.urlencode(sa_params)
-                    path = f"/v2/general?{q}"
-                    
-                    conn.request("GET", path)
-                    res = conn.getresponse()
-                    data = res.read()
-                    
-                    if res.status != 200:
-                        print(f"❌ ScrapingAnt Error: {res.status}")
-                        return ""
-                    return data.decode("utf-8")
-                except Exception as e:
-                    print(f"❌ ScrapingAnt Sync Error: {e}")
-                    return ""
-
-            return await asyncio.to_thread(_sync_request)
-
-        except Exception as e:
-            print(f"❌ Error Conexión Prod: {e}")
-            return ""
-
-
-
-    # --- LOCAL: CURL_CFFI ---
-    else:
-        print(f"💻 [LOCAL] Consultando directo...")
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Referer": "https://buscacursos.uc.cl/",
-            "Upgrade-Insecure-Requests": "1"
-        }
-        try:
-            async with AsyncSession(impersonate="chrome120") as s:
-                response = await s.get(url_base, params=params, headers=headers, timeout=30)
-                if response.status_code == 403: return ""
-                return response.text
-        except Exception as e:
-            print(f"❌ Error Local: {e}")
-            return ""
\ No newline at end of file
+            response = await self.fetch(url, params)
+        except (TimeoutError, ConnectionError, RequestException) as e:
+            raise TransientError(f"{type(e).__name__}: {e}") from e
+        status = response.status_code
+        if status >= 500 or status == 429:
+            raise TransientError(f"HTTP {status}")
+        # 4xx restantes son definitivos: reintentar solo martillaría el
+        # origen. El 403 se excluye porque el caller tiene su propio camino
+        # (rotación de huella TLS) antes de rendirse.
+        if 400 <= status < 500 and status != 403:
+            raise PermanentError(f"HTTP {status}")
+        return response
+
+    async def search_courses(self, semestre: str, sigla: str) -> str:
+        """Fetch the BuscaCursos results page HTML for (sigla, semestre)."""
+        # URL pre-armada: sin urlencode del dict completo en cada llamada
+        url = _build_search_url(semestre, sigla)
+        hit = self._search_cache.get(url)
+        if hit is not None:
+            return hit
+
+        async def _do() -> str:
+            html = await self.get_page_content(url, {})
+            if html:
+                self._search_cache[url] = html
+            return html
+
+        # Búsquedas idénticas concurrentes comparten un solo fetch
+        return await single_flight(("search_courses", url), _do)
+
+    async def get_page_response(self, url_base: str, params: dict):
+        """
+        Fetch a page and return the raw response, or None on failure/block.
+        Callers pick .text or .content according to what they feed downstream.
+        """
+        # --- PRODUCCIÓN: SCRAPINGANT ---
+        if self._use_proxy:
+            if not self._api_key:
+                logger.error("❌ Falta SCRAPINGANT_API_KEY")
+                return None
+
+            try:
+                # La URL puede venir ya armada (params vacío) o con params sueltos
+                if params:
+                    target_url = f"{url_base}?{urllib.parse.urlencode(params)}"
+                else:
+                    target_url = url_base
+
+                # Configuración "Low Cost" con parámetros del ejemplo
+                sa_params = {
+                    'url': target_url,
+                    'x-api-key': self._api_key,
+                    'proxy_type': 'residential',
+                    'browser': 'true',  # Required to avoid 423
+                    'return_page_source': 'true',
+                }
+
+                response = await self._get_httpx().get(
+                    "https://api.scrapingant.com/v2/general", params=sa_params
+                )
+                if response.status_code != 200:
+                    logger.error("❌ ScrapingAnt Error: %s", response.status_code)
+                    return None
+                return response
+
+            except Exception as e:
+                logger.error("❌ Error Conexión Prod: %s", e)
+                return None
+
+        # --- LOCAL: CURL_CFFI ---
+        else:
+            logger.debug("💻 [LOCAL] Consultando directo...")
+            # Errores transitorios agotan su presupuesto de reintentos y
+            # salen tipados (TransientError); el caller los clasifica.
+            response = await self._fetch_direct(url_base, params)
+            if response.status_code == 403:
+                # Un intento más con otra huella TLS; si el 403 persiste es
+                # bloqueo de IP y no tiene sentido insistir
+                self._rotate_browser()
+                response = await self._fetch_direct(url_base, params)
+                if response.status_code == 403: return None
+            # Centinelas sobre bytes: son ASCII puro, así que se escanea
+            # response.content directo y una página de challenge de
+            # Cloudflare ni siquiera se decodifica
+            body = response.content
+            if _DATA_RE.search(body) is None and _BLOCK_RE.search(body):
+                logger.warning("🛡️ Página de challenge detectada (Cloudflare)")
+                return None
+            return response
+
+    async def get_page_content(self, url_base: str, params: dict) -> str:
+        """Fetch a page decoded to str ("" on failure/block)."""
+        response = await self.get_page_response(url_base, params)
+        return response.text if response is not None else ""
+
+    async def get_page_bytes(self, url_base: str, params: dict) -> bytes:
+        """
+        Fetch a page as raw bytes (b"" on failure/block).
+        Preferred for the parser path: lxml decodes inside libxml2, so the
+        Python-level str round trip of .text is skipped entirely.
+        """
+        response = await self.get_page_response(url_base, params)
+        return response.content if response is not None else b""
+
+    async def aclose(self) -> None:
+        """Close the underlying sessions."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._httpx is not None:
+            await self._httpx.aclose()
+            self._httpx = None
+
+
+# Singleton de proceso: todos los módulos comparten las mismas conexiones.
+# Construcción eager — __init__ no hace I/O (las sesiones son perezosas) y
+# así no existe la carrera "dos corutinas ven None y crean dos clientes".
+_client = ScrapingHTTPClient()
+
+
+def get_http_client() -> ScrapingHTTPClient:
+    """Get the shared scraping client."""
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client's sessions (called on app shutdown)."""
+    await _client.aclose()
+
+
+async def get_page_content(url_base: str, params: dict) -> str:
+    """Module-level convenience wrapper over the shared client."""
+    return await get_http_client().get_page_content(url_base, params)
+
+
+async def get_page_bytes(url_base: str, params: dict) -> bytes:
+    """Module-level convenience wrapper over the shared client (bytes)."""
+    return await get_http_client().get_page_bytes(url_base, params)
@@ -26,15 +26,19 @@ Schedule format in nested table:
   Row 1: <td>M:5</td><td>AYU</td><td>(Por Asignar)</td>
   Row 2: <td>J:5,6</td><td>CLAS</td><td>(Por Asignar)</td>
 """
+import asyncio
+import logging
 import re
 from typing import List
 
-from bs4 import BeautifulSoup, Tag
+from lxml import html as lxml_html
+from lxml.html import HtmlElement
 
 from app.core.cache import cached
+from app.core.config import get_settings
 from app.core.logging import get_logger
 from app.models.schemas import CursoSchema, HorarioSchema, VacanteDistribucion
-from app.services.http_client import get_page_content
+from app.services.http_client import TransientError, get_http_client, get_page_bytes
 
 logger = get_logger("scraper")
 
@@ -58,6 +62,12 @@ DIAS_MAP = {
 # Data Sanitization Helpers
 # ============================================================================
 
+# Tabla para limpiar celdas numéricas en una sola pasada C: separadores de
+# miles (punto español), comas, espacios, tabs y non-breaking spaces (\xa0,
+# frecuentes en HTML scrapeado)
+_INT_TRANS = str.maketrans("", "", ". ,\t\xa0")
+
+
 def clean_int(text: str, default: int = 0) -> int:
     """
     Clean and convert string to integer.
@@ -66,7 +76,7 @@ def clean_int(text: str, default: int = 0) -> int:
     if not text:
         return default
     try:
-        cleaned = text.strip().replace(".", "").replace(",", "").replace(" ", "")
+        cleaned = text.translate(_INT_TRANS)
         if not cleaned:
             return default
         return int(cleaned)
@@ -74,11 +84,11 @@ def clean_int(text: str, default: int = 0) -> int:
         return default
 
 
-def extract_text(element: Tag | None) -> str:
-    """Extract text from a BeautifulSoup element."""
+def extract_text(element: HtmlElement | None) -> str:
+    """Extract stripped text from an lxml element (descendants included)."""
     if element is None:
         return ""
-    return element.get_text(strip=True)
+    return element.text_content().strip()
 
 
 # ============================================================================
@@ -100,8 +110,11 @@ def extract_text(element: Tag | None) -> str:
 # Valid day codes: L=Lunes, M=Martes, W=Miércoles, J=Jueves, V=Viernes, S=Sábado, D=Domingo
 SCHEDULE_CELL_PATTERN = re.compile(r'^([LMWJVSD](?:-[LMWJVSD])*):(.+)$', re.IGNORECASE)
 
+# Valores válidos del dropdown de semestres (ej: 2026-1, 2025-S, 2024-3)
+_SEM_RE = re.compile(r"^20\d{2}-[12S3]$")
+
 
-def parse_schedule_table(schedule_cell: Tag) -> List[HorarioSchema]:
+def parse_schedule_table(schedule_cell: HtmlElement) -> List[HorarioSchema]:
     """
     Parse schedule from nested table structure.
     
@@ -126,21 +139,26 @@ def parse_schedule_table(schedule_cell: Tag) -> List[HorarioSchema]:
         List of HorarioSchema objects
     """
     horarios: List[HorarioSchema] = []
-    
+    # Lookup hoisteado: evita el doble dispatch dict+atributo en el loop
+    # interno de días (hasta 7 iteraciones por fila)
+    dmap = DIAS_MAP.get
+
     # Find the nested table
-    nested_table = schedule_cell.find("table")
-    if not nested_table:
-        # Fallback: try to parse as plain text
-        text = schedule_cell.get_text(separator="\n", strip=True)
-        if text and text not in ("-", "POR ASIGNAR", "Por Asignar"):
-            logger.debug(f"No nested table, raw text: {text}")
+    nested_table = schedule_cell.find(".//table")
+    if nested_table is None:
+        # Curso sin horario ("POR ASIGNAR"): no hay nada que parsear.
+        # El texto crudo solo se extrae si el log DEBUG está activo.
+        if logger.isEnabledFor(logging.DEBUG):
+            text = schedule_cell.text_content().strip()
+            if text and text not in ("-", "POR ASIGNAR", "Por Asignar"):
+                logger.debug("No nested table, raw text: %s", text)
         return horarios
-    
+
     # Parse each row of the nested table
-    rows = nested_table.find_all("tr")
-    
+    rows = nested_table.findall(".//tr")
+
     for row in rows:
-        cells = row.find_all("td")
+        cells = row.xpath("./td")
         if len(cells) < 2:
             continue
         
@@ -159,21 +177,20 @@ def parse_schedule_table(schedule_cell: Tag) -> List[HorarioSchema]:
             sala = sala.strip("()")
         
         # Parse DIAS:MODULOS
-        match = SCHEDULE_CELL_PATTERN.match(dias_modulos_text)
-        if not match:
-            logger.debug(f"Could not parse schedule cell: '{dias_modulos_text}'")
+        if (match := SCHEDULE_CELL_PATTERN.match(dias_modulos_text)) is None:
+            logger.debug("Could not parse schedule cell: %r", dias_modulos_text)
             continue
-        
-        dias_raw = match.group(1).upper()  # e.g., "L", "M-J", "L-W"
-        modulos_raw = match.group(2)       # e.g., "2", "5,6"
-        
-        # Parse modules to list of integers
-        modulos: List[int] = []
-        for m in modulos_raw.split(","):
-            m = m.strip()
-            if m.isdigit():
-                modulos.append(int(m))
-        
+
+        # Un solo llamado C + unpack en vez de dos .group() separados
+        dias_raw, modulos_raw = match.groups()  # e.g., ("L-W", "5,6")
+        dias_raw = dias_raw.upper()
+
+        # Parse modules to an immutable tuple of integers
+        modulos = tuple(
+            int(m) for m in (part.strip() for part in modulos_raw.split(","))
+            if m.isdigit()
+        )
+
         if not modulos or not tipo:
             continue
         
@@ -183,12 +200,14 @@ def parse_schedule_table(schedule_cell: Tag) -> List[HorarioSchema]:
         
         for dia_code in dias_list:
             # Map day code to full Spanish name (W = Miércoles)
-            dia_nombre = DIAS_MAP.get(dia_code, dia_code)
+            dia_nombre = dmap(dia_code, dia_code)
             
-            horarios.append(HorarioSchema(
+            # model_construct: los valores ya vienen tipados y saneados,
+            # no hace falta pagar la validación de pydantic por cada bloque
+            horarios.append(HorarioSchema.model_construct(
                 tipo=tipo,
                 dia=dia_nombre,
-                modulos=modulos.copy(),  # Copy to avoid shared references
+                modulos=modulos,  # tupla inmutable, se comparte sin copiar
                 sala=sala if sala and sala.lower() != "por asignar" else None,
             ))
     
@@ -199,7 +218,7 @@ def parse_schedule_table(schedule_cell: Tag) -> List[HorarioSchema]:
 # HTML Table Parsing - REAL 18-COLUMN STRUCTURE
 # ============================================================================
 
-def parse_html_to_courses(html: str) -> List[CursoSchema]:
+def parse_html_to_courses(html: str | bytes) -> List[CursoSchema]:
     """
     Parse BuscaCursos HTML response into CursoSchema objects.
     
@@ -224,45 +243,53 @@ def parse_html_to_courses(html: str) -> List[CursoSchema]:
     - 17: Agregar al horario
     
     Args:
-        html: Raw HTML string from BuscaCursos
-    
+        html: Raw HTML from BuscaCursos. Bytes are preferred: libxml2
+            decodes them natively, skipping the Python-level str round trip.
+
     Returns:
         List of CursoSchema objects
     """
-    soup = BeautifulSoup(html, "lxml")
     cursos: List[CursoSchema] = []
-    
+    if not html:
+        return cursos
+
+    # lxml directo (sin el wrapper Python de BS4): el árbol y el matcheo de
+    # filas corren en C, y cada fila devuelve sus celdas como lista C-level
+    doc = lxml_html.fromstring(html)
+
     # Find all data rows with class resultadosRowPar or resultadosRowImpar
-    rows = soup.find_all("tr", class_=re.compile(r"resultadosRow(Par|Impar)"))
-    
+    rows = doc.xpath('//tr[starts-with(@class, "resultadosRow")]')
+
     if not rows:
         logger.warning("No result rows found in HTML")
         return cursos
-    
-    logger.debug(f"Found {len(rows)} result rows")
-    
+
+    logger.debug("Found %d result rows", len(rows))
+
     for row in rows:
         try:
-            cols = row.find_all("td")
-            
+            # Column 0: NRC. Se mira solo la primera celda antes de
+            # materializar la lista completa: filas de cabecera/pie se
+            # descartan sin pagar las 18 columnas
+            nrc = extract_text(row.find("td"))
+            if not nrc or not nrc.isdigit():
+                continue
+
+            cols = row.xpath("./td")
+
             # Need at least 17 columns
             if len(cols) < 17:
-                logger.debug(f"Row has only {len(cols)} columns, skipping")
-                continue
-            
-            # Column 0: NRC
-            nrc = extract_text(cols[0])
-            if not nrc or not nrc.isdigit():
+                logger.debug("Row has only %d columns, skipping", len(cols))
                 continue
-            
+
             # Column 1: Sigla (extract text, ignoring the img tag)
             sigla_cell = cols[1]
             # Find the text after the img or in the div
             sigla = ""
-            sigla_div = sigla_cell.find("div")
-            if sigla_div:
+            sigla_div = sigla_cell.find(".//div")
+            if sigla_div is not None:
                 # Get all text, remove "info" icon part
-                sigla = sigla_div.get_text(strip=True)
+                sigla = sigla_div.text_content().strip()
                 # The sigla is the last part after any image alt text
                 sigla = sigla.replace("Info", "").strip()
             else:
@@ -298,7 +325,7 @@ def parse_html_to_courses(html: str) -> List[CursoSchema]:
             # Check if course has lab/taller requirement
             requiere_lab = any(h.tipo in ("LAB", "TAL") for h in horarios)
             
-            cursos.append(CursoSchema(
+            cursos.append(CursoSchema.model_construct(
                 nrc=nrc,
                 sigla=sigla,
                 seccion=seccion,
@@ -313,10 +340,10 @@ def parse_html_to_courses(html: str) -> List[CursoSchema]:
             ))
             
         except Exception as e:
-            logger.debug(f"Error parsing course row: {e}")
+            logger.debug("Error parsing course row: %s", e)
             continue
     
-    logger.info(f"Parsed {len(cursos)} courses from HTML")
+    logger.info("Parsed %d courses from HTML", len(cursos))
     return cursos
 
 
@@ -324,41 +351,62 @@ def parse_html_to_courses(html: str) -> List[CursoSchema]:
 # Main Scraper Functions
 # ============================================================================
 
-from app.services.http_client import get_page_content
+@cached(ttl=60, key=lambda semestre, sigla: (semestre, sigla))
+async def search_and_parse(semestre: str, sigla: str) -> List[CursoSchema]:
+    """
+    Fetch the BuscaCursos results page for (sigla, semestre) and parse it.
+
+    Memoized for 60s: during course-selection bursts the same popular
+    siglas get queried over and over, and repeat hits skip both the
+    network round trip and the HTML parse.
+    """
+    html = await get_http_client().search_courses(semestre=semestre, sigla=sigla)
+    return parse_html_to_courses(html)
+
+
+@cached(ttl=3600, key=lambda: "semestres")
+async def _fetch_semestres() -> List[str]:
+    """
+    Fetch and parse the semester dropdown from the landing page.
+    Raises on a failed/blocked fetch so the 1h cache never stores the
+    failure — only a real semester list gets pinned.
+    """
+    # Use simple params to get the page
+    html = await get_page_bytes(get_settings().buscacursos_base_url, {})
+    if not html:
+        raise TransientError("empty response for semester list")
+
+    doc = lxml_html.fromstring(html)
+
+    # Find semester dropdown
+    selects = doc.xpath('//select[@name="cxml_semestre"]')
+    if not selects:
+        return []
+
+    semestres = []
+    for option in selects[0].findall(".//option"):
+        value = option.get("value", "")
+        if _SEM_RE.match(value):
+            semestres.append(value)
+
+    return semestres
+
 
 async def get_semestres_disponibles() -> List[str]:
     """
     Get list of available semesters from BuscaCursos.
-    
+
+    Cached for an hour: the list changes a couple of times a year, so
+    routine polling should not re-fetch and re-parse the landing page.
+    Failures are not cached — the next call retries upstream.
+
     Returns:
         List of semester strings (e.g., ["2026-1", "2025-2"])
     """
-    from app.core.config import get_settings
-    settings = get_settings()
-    
     try:
-        # Use simple params to get the page
-        html = await get_page_content(settings.buscacursos_base_url, {})
-        if not html:
-            return []
-            
-        soup = BeautifulSoup(html, "lxml")
-        
-        # Find semester dropdown
-        select = soup.find("select", {"name": "cxml_semestre"})
-        if not select:
-            return []
-        
-        semestres = []
-        for option in select.find_all("option"):
-            value = option.get("value", "")
-            if re.match(r"^20\d{2}-[12S3]$", value):
-                semestres.append(value)
-        
-        return semestres
-        
+        return await _fetch_semestres()
     except Exception as e:
-        logger.error(f"Error fetching semesters: {e}")
+        logger.error("Error fetching semesters: %s", e)
         return []
 
 
@@ -366,9 +414,8 @@ async def get_vacantes_detalle(nrc: str, semestre: str) -> List[VacanteDistribuc
     """
     Fetch detailed vacancy distribution for a specific course section (NRC).
     """
-    from app.core.config import get_settings
     settings = get_settings()
-    
+
     # URL construction
     base_url = settings.buscacursos_base_url
     url = f"{base_url}/informacionVacReserva.ajax.php"
@@ -378,21 +425,21 @@ async def get_vacantes_detalle(nrc: str, semestre: str) -> List[VacanteDistribuc
     }
     
     try:
-        logger.info(f"Fetching vacancies details for NRC {nrc} - {semestre}")
-        html = await get_page_content(url, params)
-        
+        logger.info("Fetching vacancies details for NRC %s - %s", nrc, semestre)
+        html = await get_page_bytes(url, params)
+
         if not html:
             return []
             
-        soup = BeautifulSoup(html, "lxml")
-        
+        doc = lxml_html.fromstring(html)
+
         # Find rows
-        rows = soup.find_all("tr", class_=re.compile(r"resultadosRow(Par|Impar)"))
-        
+        rows = doc.xpath('//tr[starts-with(@class, "resultadosRow")]')
+
         results: List[VacanteDistribucion] = []
-        
+
         for row in rows:
-            cols = row.find_all("td")
+            cols = row.xpath("./td")
             # Need at least 9 cols
             if len(cols) < 9:
                 continue
@@ -418,9 +465,81 @@ async def get_vacantes_detalle(nrc: str, semestre: str) -> List[VacanteDistribuc
                 disponibles=disponibles
             ))
             
-        logger.info(f"Found {len(results)} vacancy types for NRC {nrc}")
+        logger.info("Found %d vacancy types for NRC %s", len(results), nrc)
         return results
         
     except Exception as e:
-        logger.error(f"Error fetching vacancy details for {nrc}: {e}")
+        logger.error("Error fetching vacancy details for %s: %s", nrc, e)
         return []
+
+
+class VacanciesBatcher:
+    """
+    Coalesces bursts of single-NRC vacancy lookups into one batch.
+
+    A UI asking for the vacancies of a whole results table fires tens of
+    /vacantes requests within milliseconds. Instead of dispatching each
+    one the moment it arrives, lookups accumulate for a short window
+    (~20ms) and then go out together via get_vacantes_detalle_many,
+    sharing the pooled session and a single scheduling pass.
+    """
+
+    def __init__(self, window: float = 0.02) -> None:
+        self._window = window
+        # Pendientes agrupados por semestre; cada entrada lleva el future
+        # del caller que la pidió
+        self._pending: dict[str, list[tuple[str, asyncio.Future]]] = {}
+
+    async def get(self, nrc: str, semestre: str) -> List[VacanteDistribucion]:
+        """Queue one NRC lookup and await its slice of the batch result."""
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        batch = self._pending.get(semestre)
+        if batch is None:
+            # Primer pedido de la ventana: agenda el flush diferido
+            self._pending[semestre] = batch = []
+            loop.call_later(
+                self._window,
+                lambda: asyncio.ensure_future(self._flush(semestre)),
+            )
+        batch.append((nrc, fut))
+        return await fut
+
+    async def _flush(self, semestre: str) -> None:
+        batch = self._pending.pop(semestre, [])
+        if not batch:
+            return
+        # NRCs únicos en orden de llegada; duplicados comparten un fetch
+        nrcs = list(dict.fromkeys(nrc for nrc, _ in batch))
+        try:
+            results = await get_vacantes_detalle_many(nrcs, semestre)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for nrc, fut in batch:
+            if not fut.done():
+                fut.set_result(results.get(nrc, []))
+
+
+# Singleton de proceso: todos los endpoints comparten la misma ventana
+vacancies_batcher = VacanciesBatcher()
+
+
+async def get_vacantes_detalle_many(
+    nrcs: List[str], semestre: str, concurrency: int = 20
+) -> dict[str, List[VacanteDistribucion]]:
+    """
+    Fetch vacancy distributions for many NRCs concurrently.
+
+    All requests run in parallel on the shared pooled session (bounded by
+    ``concurrency``), so total wall time is ~1 RTT instead of N.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(nrc: str) -> tuple[str, List[VacanteDistribucion]]:
+        async with sem:
+            return nrc, await get_vacantes_detalle(nrc, semestre)
+
+    return dict(await asyncio.gather(*(one(n) for n in nrcs)))
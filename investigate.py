@@ -1,4 +1,10 @@
+"""
+Ad-hoc probe of the vacancy AJAX endpoint.
 
+Usage: python investigate.py [--warmup]
+  --warmup   do a full course search first to warm session/cookies
+             (off by default; the AJAX endpoint doesn't need it)
+"""
 import asyncio
 import sys
 import os
@@ -9,6 +15,31 @@ sys.path.append(os.getcwd())
 from app.services.http_client import get_http_client, close_http_client
 from bs4 import BeautifulSoup
 
+
+async def fetch_with_retry(client, url, max_retries=5):
+    """
+    GET with exponential backoff. Treats 429/503 and transport errors as
+    overload signals: back off instead of hammering an already-saturated
+    proxy; anything else (incl. 403) returns/raises immediately.
+    """
+    delay = 1.0
+    for attempt in range(1, max_retries + 1):
+        try:
+            response = await client.fetch(url)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            print(f"Attempt {attempt} failed ({e}), retrying in {delay:.0f}s...")
+        else:
+            if response.status_code not in (429, 503):
+                return response
+            if attempt == max_retries:
+                return response
+            print(f"HTTP {response.status_code} (attempt {attempt}), retrying in {delay:.0f}s...")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 15)
+
+
 async def main():
     client = get_http_client()
     # Search for a course that likely has reserved vacancies or specific distribution
@@ -17,33 +48,46 @@ async def main():
     semestre = "2025-1" # Or 2026-1 as per default in code
     
 
-    output = []
-    output.append(f"Searching for {sigla} in {semestre}...")
-    try:
-        # First get the main page to populate session/cookies if any (important for simulated human nav)
-        await client.search_courses(semestre=semestre, sigla=sigla)
-        
-        # Test fetching the vacancy info for one NRC from the previous output (e.g., 14778)
-        nrc = "14778"
-        p_semestre = "2025-1"
-        
-        # The URL from the onclick was ./informacionVacReserva.ajax.php...
-        # So it is relative to the base URL.
-        ajax_url = f"https://buscacursos.uc.cl/informacionVacReserva.ajax.php?nrc={nrc}&termcode={p_semestre}"
-        
-        output.append(f"Fetching vacancy details from: {ajax_url}")
-        response_ajax = await client.fetch(ajax_url)
-        
-        output.append("Status Code: " + str(response_ajax.status_code))
-        output.append("Content:")
-        output.append(response_ajax.text)
-        
-    except Exception as e:
-        output.append(f"Error: {e}")
-    finally:
-        with open("investigate_output.txt", "w", encoding="utf-8") as f:
-            f.write("\n".join(output))
-        await close_http_client()
+    # Escritura incremental line-buffered: si el script muere a mitad de
+    # camino el archivo igual queda con el diagnóstico parcial (y se puede
+    # hacer tail durante corridas largas)
+    with open("investigate_output.txt", "w", encoding="utf-8", buffering=1) as f:
+        def log(msg):
+            print(msg, file=f)
+
+        try:
+            # Búsqueda previa solo con --warmup: la sesión no necesita cookies
+            # para el AJAX, así que por defecto se ahorra esa descarga completa
+            if "--warmup" in sys.argv:
+                log(f"Searching for {sigla} in {semestre}...")
+                await client.search_courses(semestre=semestre, sigla=sigla)
+
+            # Test fetching the vacancy info for one NRC from the previous output (e.g., 14778)
+            nrc = "14778"
+            p_semestre = "2025-1"
+
+            # The URL from the onclick was ./informacionVacReserva.ajax.php...
+            # So it is relative to the base URL.
+            ajax_url = f"https://buscacursos.uc.cl/informacionVacReserva.ajax.php?nrc={nrc}&termcode={p_semestre}"
+
+            log(f"Fetching vacancy details from: {ajax_url}")
+            response_ajax = await fetch_with_retry(client, ajax_url)
+
+            log("Status Code: " + str(response_ajax.status_code))
+            log("Content:")
+            log(response_ajax.text)
+
+        except Exception as e:
+            log(f"Error: {e}")
+        finally:
+            await close_http_client()
+
+# uvloop (viene con uvicorn[standard]): loop en C, mismo que usa la API
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -5,25 +5,39 @@ import os
 
 sys.path.append(os.getcwd())
 
-from app.services.scraper import get_vacantes_detalle
+from app.services.scraper import get_vacantes_detalle_many
 
 async def main():
-    nrc = "14778" # From previous investigation (Calculo I)
-    semestre = "2025-1"
-    
-    output = []
-    output.append(f"Fetching vacancies for NRC {nrc}...")
-    try:
-        results = await get_vacantes_detalle(nrc, semestre)
-        
-        output.append(f"Got {len(results)} rows.")
-        for res in results:
-            output.append(f"{res.escuela}: {res.disponibles} disponibles (de {res.ofrecidas})")
-    except Exception as e:
-        output.append(f"Error: {e}")
-        
-    with open("verify_output.txt", "w", encoding="utf-8") as f:
-        f.write("\n".join(output))
+    # Uso: python verify.py [NRC ...]  (SEMESTRE opcional por variable de entorno)
+    nrcs = sys.argv[1:] or ["14778"]  # Default: Calculo I, de la investigación previa
+    semestre = os.environ.get("SEMESTRE", "2025-1")
+
+    # Escritura incremental line-buffered: un crash a mitad de camino deja
+    # igual la salida parcial en disco
+    with open("verify_output.txt", "w", encoding="utf-8", buffering=1) as f:
+        def log(msg):
+            print(msg, file=f)
+
+        log(f"Fetching vacancies for {len(nrcs)} NRC(s) in {semestre}...")
+        try:
+            # Un solo proceso/loop para todos los NRCs: el fetch batch corre
+            # en paralelo acotado sobre la sesión compartida
+            results = await get_vacantes_detalle_many(nrcs, semestre)
+
+            for nrc in nrcs:
+                rows = results.get(nrc, [])
+                log(f"NRC {nrc}: {len(rows)} rows.")
+                for res in rows:
+                    log(f"  {res.escuela}: {res.disponibles} disponibles (de {res.ofrecidas})")
+        except Exception as e:
+            log(f"Error: {e}")
+
+# uvloop (viene con uvicorn[standard]): loop en C, mismo que usa la API
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
 
 if __name__ == "__main__":
     asyncio.run(main())